@@ -1,12 +1,23 @@
 import os
-import pandas as pd
+import sys
+import atexit
+import csv
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import orjson
+import hashlib
+import functools
+import shelve
 import re
 import time
 import logging
+import logging.handlers
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
-from typing import List, Dict
+from typing import Callable, List, Dict, Pattern, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,33 +29,274 @@ if os.path.exists(LOG_FILE):
     os.remove(LOG_FILE)
 
 # Configure logging to write detailed debug output to cons_debug.txt.
+# The calling thread only formats each record and puts it on a queue; log_listener writes the
+# queued lines to the file from a background thread, and is stopped (flushing the queue) at exit.
+_log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(_log_queue, logging.FileHandler(LOG_FILE, mode='w'))
 logging.basicConfig(
-    filename=LOG_FILE,
     level=logging.DEBUG,
     format='%(asctime)s %(levelname)s: %(message)s',
-    filemode='w'
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
+logger = logging.getLogger(__name__)
+
+# Brave's API allows one request per second; the limiter below is shared by all worker threads.
+BRAVE_MIN_INTERVAL = 1.0
+# Number of organizations processed concurrently.
+MAX_WORKERS = 4
+# Retries on HTTP 429 before giving up; the wait doubles after each attempt.
+MAX_RETRIES = 3
+INITIAL_BACKOFF = 5
+# Brave search results are cached on disk and reused for a day.
+BRAVE_CACHE_PATH = '.brave_cache'
+BRAVE_CACHE_TTL = 24 * 60 * 60
+# Parsed Claude responses are cached on disk and reused for a week.
+LLM_CACHE_PATH = '.llm_cache'
+LLM_CACHE_TTL = 7 * 24 * 60 * 60
+# Answers are also indexed by the set of the organization's own-site result URLs they were based on,
+# so a differently phrased name for the same organization (e.g. "UW Whitewater") can reuse them.
+# Two entries count as the same organization only if their URL sets share at least MIN_SHARED_URLS
+# URLs, their Jaccard similarity reaches SIMILARITY_THRESHOLD, and the two names share a
+# distinctive word (see _GENERIC_NAME_WORDS).
+SIMILAR_CACHE_PATH = '.llm_cache_similar'
+SIMILARITY_THRESHOLD = 0.8
+MIN_SHARED_URLS = 3
+
+# Words ignored when matching an organization's name against search results and hostnames.
+_COMMON_WORDS = frozenset({"the", "of", "and", "company", "inc", "co", "-"})
+# Words too common in organization names to show that two names refer to the same organization.
+_GENERIC_NAME_WORDS = frozenset({
+    "university", "college", "school", "institute", "energy", "power", "electric", "utility", "utilities",
+    "gas", "water", "center", "centre", "city", "county", "state", "national", "international",
+    "new", "north", "south", "east", "west", "downtown", "na", "us", "usa", "america", "american",
+    "group", "corp", "corporation", "llc", "ltd", "holdings", "services", "systems", "district",
+})
+# Phrases in a result's description that suggest it discusses a decarbonization goal.
+_GOAL_KEYWORDS = ("decarbon", "net zero", "net-zero", "carbon neutral")
+_YEAR_RE = re.compile(r'\b(20\d{2})\b')
+# Hostname of an absolute URL, skipping any "user:password@" part.
+_HOST_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+\-.]*://(?:[^/?#@]*@)?([^/:?#]+)')
+_JSON_START_RE = re.compile(r'[\[{]')
+_JSON_DECODER = json.JSONDecoder()
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+ANTHROPIC_MODEL = "claude-3-5-sonnet-20241022"
+# Columns of the output CSV, in order.
+CSV_FIELDS = ["organization", "has_goal", "target_date", "source_url", "description"]
+# Column titles used when the results are echoed to the console.
+CONSOLE_HEADER = ["Organization", "Decarbonization Goal?", "Target Date", "Source URL", "Description"]
+# At most this many search results per organization are included in the prompt.
+MAX_CONTEXT_RESULTS = 3
+# Organizations analyzed per Anthropic request; the instructions below are sent once per batch.
+BATCH_SIZE = 5
+ANALYSIS_INSTRUCTIONS = (
+    "Based on the search results below, determine the following for each organization using only information from "
+    "that organization's official website or its official press releases (do not use third-party sites):\n"
+    "1. Does the organization have a stated decarbonization goal? (Answer Yes, No, or Not Found)\n"
+    "2. If yes, what is their target date?\n"
+    "3. What is the source URL for this information?\n"
+    "4. In one to two sentences, provide a short description summarizing the organization's decarbonization goal, mission, or strategy.\n\n"
+    "Please provide the answers as a JSON list with one object per organization, in the order the organizations "
+    "are given, with keys: organization, has_goal, target_date, source_url, description"
+)
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls at least min_interval seconds apart."""
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+
+    def wait(self):
+        """Block until the caller is allowed to make its request."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+class ResponseCache:
+    """Thread-safe on-disk cache backed by shelve; entries expire ttl seconds after they are stored."""
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return the cached value for key, or None if it is missing or expired. Expired entries are deleted."""
+        with self._lock, shelve.open(self.path) as db:
+            entry = db.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del db[key]
+                return None
+        return value
+
+    def set(self, key: str, value):
+        """Store value under key with the current timestamp."""
+        with self._lock, shelve.open(self.path) as db:
+            db[key] = (time.time(), value)
+
+    def values(self) -> List:
+        """Return all values that have not expired, deleting the expired ones."""
+        now = time.time()
+        values = []
+        with self._lock, shelve.open(self.path) as db:
+            for key in list(db.keys()):
+                stored_at, value = db[key]
+                if now - stored_at > self.ttl:
+                    del db[key]
+                else:
+                    values.append(value)
+        return values
+
+def analysis_fingerprint() -> str:
+    """Return a hash of the model and instructions, which together determine how an answer was produced."""
+    return hashlib.sha256(json.dumps(
+        {"model": ANTHROPIC_MODEL, "instructions": ANALYSIS_INSTRUCTIONS}, sort_keys=True
+    ).encode()).hexdigest()
+
+def _distinctive_tokens(org_name: str) -> frozenset:
+    """Return the organization name's tokens that are not generic organization-name words."""
+    return frozenset(token for token in _org_tokens(org_name) if token not in _GENERIC_NAME_WORDS)
+
+def normalize_result_urls(search_results: List[Dict]) -> frozenset:
+    """Return the result URLs reduced to lowercase host and path, ignoring scheme, "www." and trailing slashes."""
+    urls = set()
+    for r in search_results:
+        parsed = urlparse(r.get("url", ""))
+        host = (parsed.hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        if host:
+            urls.add(host + parsed.path.rstrip("/"))
+    return frozenset(urls)
+
+@functools.lru_cache(maxsize=512)
+def _org_tokens(org_name: str) -> Tuple[str, ...]:
+    """Return the lowercased words of the organization name, ignoring common words."""
+    return tuple(token for token in org_name.lower().split() if token not in _COMMON_WORDS)
+
+@functools.lru_cache(maxsize=512)
+def _org_token_re(org_name: str) -> Pattern:
+    """
+    Return a compiled alternation of the organization's name tokens, so a single regex scan
+    replaces one substring test per token. A name with no tokens never matches.
+    """
+    tokens = _org_tokens(org_name)
+    if not tokens:
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(re.escape(token) for token in tokens))
+
+def _hostname(url: str) -> str:
+    """Return the lowercased hostname of an absolute URL, or "" if it has none."""
+    match = _HOST_RE.match(url)
+    return match.group(1).lower() if match else ""
 
 def result_matches_org(org_name: str, result: Dict) -> bool:
     """Return True if any token from the organization name (ignoring common words) is found in the result's title or description."""
-    org_tokens = org_name.lower().split()
-    common_words = {"the", "of", "and", "company", "inc", "co", "-"}
-    org_tokens = [token for token in org_tokens if token not in common_words]
+    token_re = _org_token_re(org_name)
     title = result.get('title', '').lower()
     desc = result.get('description', '').lower()
-    return any(token in title or token in desc for token in org_tokens)
+    return bool(token_re.search(title) or token_re.search(desc))
 
 def url_belongs_to_org(org_name: str, url: str) -> bool:
     """
-    Parse the URL and return True if any token (ignoring common words)
-    from the organization name appears in the hostname.
+    Return True if any token (ignoring common words)
+    from the organization name appears in the URL's hostname.
+    """
+    return bool(_org_token_re(org_name).search(_hostname(url)))
+
+def mentions_goal(result: Dict) -> bool:
+    """Return True if the result's description mentions decarbonization, net zero or carbon neutrality."""
+    desc = result.get('description', '').lower()
+    return any(keyword in desc for keyword in _GOAL_KEYWORDS)
+
+def is_json_answer(value) -> bool:
+    """Return whether a parsed JSON value has the shape of Claude's answer: an object or a non-empty list of objects."""
+    if isinstance(value, dict):
+        return True
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+def find_json_answer(text: str, start: int = 0, complete: bool = True) -> Tuple[object, int]:
+    """
+    Scans text from start for a JSON value shaped like Claude's answer, skipping bracketed prose
+    such as "(see [1])". Returns the value, or None, and the offset to resume scanning from.
+    While the reply is still streaming (complete=False), a bracket that does not parse may open
+    the unfinished answer, so scanning stops there until more text arrives.
     """
-    parsed = urlparse(url)
-    hostname = parsed.hostname or ""
-    org_tokens = org_name.lower().split()
-    common_words = {"the", "of", "and", "company", "inc", "co", "-"}
-    org_tokens = [token for token in org_tokens if token not in common_words]
-    return any(token in hostname for token in org_tokens)
+    opening = _JSON_START_RE.search(text, start)
+    while opening:
+        try:
+            value, end = _JSON_DECODER.raw_decode(text, opening.start())
+        except json.JSONDecodeError:
+            if not complete:
+                return None, opening.start()
+            opening = _JSON_START_RE.search(text, opening.start() + 1)
+            continue
+        if is_json_answer(value):
+            return value, end
+        # Wrong shape: resume after the whole value rather than inside it.
+        opening = _JSON_START_RE.search(text, end)
+    return None, len(text)
+
+def _normalize_org_name(org_name) -> str:
+    """Return the organization name lowercased, with punctuation and repeated spaces collapsed."""
+    return _NON_ALNUM_RE.sub(' ', str(org_name).lower()).strip()
+
+def match_answers(org_names: List[str], answers, label: str) -> List[Dict]:
+    """
+    Pairs Claude's answers with the organizations they were requested for, by each answer's
+    "organization" value. Position is only used when no answer names its organization.
+    Organizations whose answer is missing, unmatched or duplicated get an empty dict, so a
+    misattributed answer is never returned or cached.
+    """
+    # A single organization may come back as a bare object instead of a one-item list.
+    if isinstance(answers, dict):
+        answers = [answers]
+    if not isinstance(answers, list):
+        if answers is not None:
+            logger.error("Expected a list of answers from Claude for %s, got: %s", label, answers)
+        return [{} for _ in org_names]
+    answers = [answer for answer in answers if isinstance(answer, dict)]
+
+    if not any(answer.get("organization") for answer in answers):
+        if len(answers) != len(org_names):
+            logger.error("Expected %s answers from Claude for %s, got: %s", len(org_names), label, answers)
+            return [{} for _ in org_names]
+        return answers
+
+    answers_by_name = {}
+    for answer in answers:
+        answers_by_name.setdefault(_normalize_org_name(answer.get("organization", "")), []).append(answer)
+    normalized_names = [_normalize_org_name(org_name) for org_name in org_names]
+    matched = []
+    for org_name, normalized_name in zip(org_names, normalized_names):
+        candidates = answers_by_name.get(normalized_name, [])
+        if len(candidates) == 1 and normalized_names.count(normalized_name) == 1:
+            matched.append(candidates[0])
+        else:
+            logger.error("Found %s answers from Claude for %s in %s; ignoring them.", len(candidates), org_name, label)
+            matched.append({})
+    unmatched = set(answers_by_name) - set(normalized_names)
+    if unmatched:
+        logger.error("Ignoring answers from Claude for unrequested organizations in %s: %s", label, sorted(unmatched))
+    return matched
+
+def official_search_results(org_name: str, search_results: List[Dict]) -> List[Dict]:
+    """
+    Return the results that mention the organization and are hosted on its own site,
+    the only ones trusted for the fallback fields.
+    """
+    return [
+        r for r in search_results
+        if result_matches_org(org_name, r) and url_belongs_to_org(org_name, r.get('url', ''))
+    ]
 
 class DecarbonizationAnalyzer:
     def __init__(self, brave_api_key: str, anthropic_api_key: str):
@@ -55,160 +307,334 @@ class DecarbonizationAnalyzer:
         self.anthropic_api_key = anthropic_api_key
         self.brave_search_endpoint = "https://api.search.brave.com/res/v1/web/search"
         self.anthropic_endpoint = "https://api.anthropic.com/v1/messages"
+        self.brave_limiter = RateLimiter(BRAVE_MIN_INTERVAL)
+        self.llm_cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL)
+        self.similar_cache = ResponseCache(SIMILAR_CACHE_PATH, LLM_CACHE_TTL)
+        # In-memory copy of similar_cache's entries, loaded on first use so lookups don't
+        # unpickle the whole shelve each time.
+        self._similar_entries = None
+        self._similar_lock = threading.Lock()
+        self.brave_cache = ResponseCache(BRAVE_CACHE_PATH, BRAVE_CACHE_TTL)
+        self.brave_headers = {
+            "Accept": "application/json",
+            "X-Subscription-Token": self.brave_api_key
+        }
+        self.anthropic_headers = {
+            "x-api-key": self.anthropic_api_key,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01",
+            "anthropic-beta": "prompt-caching-2024-07-31"
+        }
+        # One pooled session for all calls so connections (and TLS handshakes) are reused.
+        # Keys stay in the per-host header dicts above rather than the session defaults,
+        # so neither API ever receives the other's key.
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+    def close(self):
+        """Close the pooled HTTP session."""
+        self.session.close()
+
+    def _request_with_backoff(self, method: str, url: str, org_name: str, limiter: RateLimiter = None, **kwargs) -> requests.Response:
+        """
+        Sends an HTTP request, retrying with exponential backoff while the API answers 429.
+        If a limiter is given, every attempt waits for it first.
+        """
+        delay = INITIAL_BACKOFF
+        for attempt in range(MAX_RETRIES + 1):
+            if limiter:
+                limiter.wait()
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                return response
+            response.close()
+            logger.error("Rate limit hit for %s. Waiting %s seconds before retrying...", org_name, delay)
+            time.sleep(delay)
+            delay *= 2
 
     def search_organization(self, org_name: str) -> List[Dict]:
         """
         Searches Brave for pages related to the organization's decarbonization goals.
-        Enforces a one‑second delay between requests and retries once if rate limited.
+        Requests are spaced by the shared Brave rate limiter and retried with backoff if rate limited.
+        Non-empty results are cached on disk for BRAVE_CACHE_TTL seconds.
         Debug details are written to cons_debug.txt.
         """
-        headers = {
-            "Accept": "application/json",
-            "X-Subscription-Token": self.brave_api_key
-        }
         query = f"{org_name} decarbonization goals net zero carbon neutral target date"
         params = {"q": query, "count": 5}
-        logging.debug(f"Searching for organization: {org_name}")
-        logging.debug(f"Query: {query}")
-        logging.debug(f"Request params: {params}")
+        logger.debug("Searching for organization: %s", org_name)
+        logger.debug("Query: %s", query)
+        logger.debug("Request params: %s", params)
+
+        # Brave's results change slowly, so a recent answer to the same request is reused
+        # without touching the network or waiting on the rate limiter.
+        cache_key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        cached_results = self.brave_cache.get(cache_key)
+        if cached_results is not None:
+            logger.debug("Using cached search results for %s: %s", org_name, cached_results)
+            return cached_results
 
         results = []
         try:
-            response = requests.get(self.brave_search_endpoint, headers=headers, params=params)
-            if response.status_code == 429:
-                logging.error(f"Rate limit hit for {org_name}. Waiting 5 seconds before retrying...")
-                time.sleep(5)
-                response = requests.get(self.brave_search_endpoint, headers=headers, params=params)
-            logging.debug(f"Brave API response status for {org_name}: {response.status_code}")
+            response = self._request_with_backoff(
+                "GET", self.brave_search_endpoint, org_name, limiter=self.brave_limiter,
+                headers=self.brave_headers, params=params
+            )
+            logger.debug("Brave API response status for %s: %s", org_name, response.status_code)
             if response.status_code == 200:
                 try:
-                    json_data = response.json()
+                    json_data = orjson.loads(response.content)
                     results = json_data.get("web", {}).get("results", [])
-                    logging.debug(f"Search results for {org_name}: {results}")
+                    logger.debug("Search results for %s: %s", org_name, results)
+                    if results:
+                        self.brave_cache.set(cache_key, results)
                 except Exception as e:
-                    logging.error(f"Error parsing JSON response for {org_name}: {e}")
-                    logging.error("Raw response text: " + response.text)
+                    logger.error("Error parsing JSON response for %s: %s", org_name, e)
+                    logger.error("Raw response text: %s", response.text)
             else:
-                logging.error(f"Error searching for {org_name}: {response.status_code}")
-                logging.error("Response text: " + response.text)
+                logger.error("Error searching for %s: %s", org_name, response.status_code)
+                logger.error("Response text: %s", response.text)
         except Exception as e:
-            logging.error(f"Exception during search for {org_name}: {e}")
-        finally:
-            time.sleep(1)
+            logger.error("Exception during search for %s: %s", org_name, e)
         return results
 
-    def analyze_search_results(self, org_name: str, search_results: List[Dict]) -> Dict:
+    def _call_anthropic(self, label: str, data: Dict):
         """
-        Uses Anthropic's Claude to determine if the organization has a decarbonization goal,
-        extracting the target date, source URL, and a short description.
-        The prompt instructs the model to only use information from the organization's official website
-        or its official press releases.
-        Debug output is written to cons_debug.txt.
+        Posts the streaming request to Anthropic's API and returns the JSON value (object or list)
+        parsed from Claude's reply, or None if the call or parsing fails.
         """
-        if not search_results:
-            logging.error(f"No search results for {org_name}; skipping Anthropic API call.")
-            return {
-                "organization": org_name,
-                "has_goal": "Not Found",
-                "target_date": None,
-                "source_url": None,
-                "description": ""
-            }
-        
-        # Build context from search results.
-        context = f"Search results for {org_name}:\n"
-        for result in search_results:
-            context += f"Title: {result.get('title')}\n"
-            context += f"Description: {result.get('description')}\n"
-            context += f"URL: {result.get('url')}\n\n"
-        
-        # Strengthen the prompt:
-        prompt = (
-            f"Based on these search results, determine the following for {org_name} using only information from "
-            f"the organization's official website or its official press releases (do not use third-party sites):\n"
-            f"1. Does {org_name} have a stated decarbonization goal? (Answer Yes, No, or Not Found)\n"
-            f"2. If yes, what is their target date?\n"
-            f"3. What is the source URL for this information?\n"
-            f"4. In one to two sentences, provide a short description summarizing the organization's decarbonization goal, mission, or strategy.\n\n"
-            f"Search results:\n{context}\n"
-            f"Please provide the answers in JSON format with keys: has_goal, target_date, source_url, description"
-        )
-        logging.debug(f"Prompt for Anthropic API for {org_name}:\n{prompt}")
-
-        data = {
-            "model": "claude-3-5-sonnet-20241022",
-            "max_tokens": 1000,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        anthro_headers = {
-            "x-api-key": self.anthropic_api_key,
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        logging.debug(f"Posting to Anthropic API for {org_name} with data:\n{json.dumps(data, indent=2)}")
-        logging.debug(f"Request headers: {anthro_headers}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Posting to Anthropic API for %s with data:\n%s",
+                label, orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+            )
+        logger.debug("Request headers: %s", self.anthropic_headers)
 
+        parsed_response = None
         try:
-            response = requests.post(self.anthropic_endpoint, headers=anthro_headers, json=data)
-            logging.debug(f"Anthropic API response status for {org_name}: {response.status_code}")
-            if response.status_code == 200:
-                result = response.json()
-                logging.debug(f"Anthropic API response for {org_name}:\n{json.dumps(result, indent=2)}")
-                claude_response_text = ""
-                if "completion" in result:
-                    claude_response_text = result["completion"]
-                elif "content" in result:
-                    content = result["content"]
-                    if isinstance(content, list):
-                        texts = [item.get("text", "") for item in content if isinstance(item, dict)]
-                        claude_response_text = "\n".join(texts)
-                    else:
-                        claude_response_text = content
-                logging.debug(f"Extracted Claude response text:\n{claude_response_text}")
-                json_candidate = re.search(r'({.*})', claude_response_text, re.DOTALL)
-                if json_candidate:
-                    json_str = json_candidate.group(1)
-                    try:
-                        parsed_response = json.loads(json_str)
-                    except json.JSONDecodeError as e:
-                        logging.error(f"Error decoding JSON from Claude's response for {org_name}: {e}")
-                        parsed_response = {}
-                else:
-                    logging.error(f"No JSON candidate found in Claude's response for {org_name}.")
-                    parsed_response = {}
-            else:
-                logging.error(f"Error calling Anthropic API for {org_name}: {response.status_code}")
-                logging.error("Response text: " + response.text)
-                parsed_response = {}
+            response = self._request_with_backoff(
+                "POST", self.anthropic_endpoint, label,
+                headers=self.anthropic_headers, data=orjson.dumps(data), stream=True
+            )
+            logger.debug("Anthropic API response status for %s: %s", label, response.status_code)
+            if response.status_code != 200:
+                logger.error("Error calling Anthropic API for %s: %s", label, response.status_code)
+                logger.error("Response text: %s", response.text)
+                return None
+            claude_response_text, parsed_response = self._read_claude_stream(response, label)
+            logger.debug("Extracted Claude response text:\n%s", claude_response_text)
+            # No answer was recognized while streaming; scan the full text, now trying every bracket.
+            if parsed_response is None:
+                parsed_response, _ = find_json_answer(claude_response_text)
+                if parsed_response is None:
+                    logger.error("No JSON answer found in Claude's response for %s.", label)
         except Exception as e:
-            logging.error(f"Error in API call for {org_name}: {e}")
-            parsed_response = {}
+            logger.error("Error in API call for %s: %s", label, e)
+        return parsed_response
 
+    def _read_claude_stream(self, response: requests.Response, label: str) -> Tuple[str, object]:
+        """
+        Accumulates the reply text from Claude's server-sent events.
+        Stops reading, and closes the response, as soon as the text holds a complete answer (see
+        find_json_answer) so the rest of the generation is not waited for.
+        Returns the text read and the parsed answer, or None if no complete answer arrived.
+        """
+        claude_response_text = ""
+        scan_offset = 0
+        # Lines are read as bytes: the event stream carries no charset, and requests would
+        # otherwise decode it as ISO-8859-1.
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            event = orjson.loads(line[len(b"data:"):])
+            if event.get("type") == "error":
+                logger.error("Error event in Anthropic stream for %s: %s", label, event.get('error'))
+                break
+            if event.get("type") != "content_block_delta":
+                continue
+            chunk = event.get("delta", {}).get("text", "")
+            claude_response_text += chunk
+            if "]" in chunk or "}" in chunk:
+                parsed_response, scan_offset = find_json_answer(claude_response_text, scan_offset, complete=False)
+                if parsed_response is not None:
+                    response.close()
+                    return claude_response_text, parsed_response
+        return claude_response_text, None
+
+    def _get_cached_response(self, org_name: str, cache_key: str, result_urls: frozenset):
+        """
+        Returns a cached answer for the organization, first by exact cache key and then by
+        similar search results, or None if neither cache has one.
+        """
+        parsed_response = self.llm_cache.get(cache_key)
+        if parsed_response is not None:
+            logger.debug("Using cached Anthropic response for %s", org_name)
+            return parsed_response
+        parsed_response = self._find_similar_response(org_name, result_urls)
+        if parsed_response is not None:
+            logger.debug("Using cached Anthropic response from similar search results for %s", org_name)
+        return parsed_response
+
+    def _store_response(self, org_name: str, cache_key: str, result_urls: frozenset, parsed_response: Dict):
+        """Saves an answer in both the exact-match and the similar-results cache."""
+        self.llm_cache.set(cache_key, parsed_response)
+        if result_urls:
+            entry = (analysis_fingerprint(), org_name, result_urls, parsed_response)
+            urls_key = hashlib.sha256("\n".join([entry[0]] + sorted(result_urls)).encode()).hexdigest()
+            self.similar_cache.set(urls_key, entry)
+            with self._similar_lock:
+                if self._similar_entries is not None:
+                    self._similar_entries.append(entry)
+
+    def _find_similar_response(self, org_name: str, result_urls: frozenset):
+        """
+        Returns the cached response, produced with the current model and instructions for an
+        organization whose name shares a distinctive word with org_name, whose result URLs overlap
+        most with result_urls. Returns None unless that overlap is at least MIN_SHARED_URLS URLs
+        and SIMILARITY_THRESHOLD.
+        """
+        name_tokens = _distinctive_tokens(org_name)
+        if len(result_urls) < MIN_SHARED_URLS or not name_tokens:
+            return None
+        with self._similar_lock:
+            if self._similar_entries is None:
+                # Entries written before organization names were stored have only three fields.
+                self._similar_entries = [entry for entry in self.similar_cache.values() if len(entry) == 4]
+            entries = list(self._similar_entries)
+        fingerprint = analysis_fingerprint()
+        best_response = None
+        best_score = 0.0
+        for stored_fingerprint, stored_org_name, stored_urls, response in entries:
+            if stored_fingerprint != fingerprint or not name_tokens & _distinctive_tokens(stored_org_name):
+                continue
+            shared_urls = len(result_urls & stored_urls)
+            if shared_urls < MIN_SHARED_URLS:
+                continue
+            score = shared_urls / len(result_urls | stored_urls)
+            if score > best_score:
+                best_response, best_score = response, score
+        if best_score >= SIMILARITY_THRESHOLD:
+            return best_response
+        return None
+
+    def analyze_batch(self, items: List[Tuple[str, List[Dict]]]) -> List[Dict]:
+        """
+        Uses Anthropic's Claude to determine, for each (organization, search results) pair,
+        whether the organization has a decarbonization goal, extracting the target date,
+        source URL, and a short description.
+        Organizations without a cached answer are sent together in a single request so the
+        shared instructions are only paid for once per batch.
+        The prompt instructs the model to only use information from each organization's official
+        website or its official press releases.
+        Debug output is written to cons_debug.txt.
+        """
+        parsed_responses = [{} for _ in items]
+        official_results = [official_search_results(org_name, search_results) for org_name, search_results in items]
+        pending = []
+        for i, (org_name, search_results) in enumerate(items):
+            if not search_results:
+                logger.error("No search results for %s; skipping Anthropic API call.", org_name)
+                continue
+
+            # Without a result from the organization's own site or one that mentions a goal, Claude can only
+            # answer "Not Found", so the request is skipped.
+            if not official_results[i] and not any(mentions_goal(r) for r in search_results):
+                logger.debug("No official or goal-related search results for %s; skipping Anthropic API call.", org_name)
+                continue
+
+            # Build context from search results, keeping only those from the organization's own site or
+            # that mention a goal, since Claude is told to ignore everything else anyway.
+            relevant_results = [
+                r for r in search_results
+                if url_belongs_to_org(org_name, r.get('url', '')) or mentions_goal(r)
+            ][:MAX_CONTEXT_RESULTS]
+            context = f"Search results for {org_name}:\n"
+            for result in relevant_results:
+                context += f"Title: {result.get('title')}\n"
+                context += f"Description: {result.get('description')}\n"
+                context += f"URL: {result.get('url')}\n\n"
+
+            # An organization's part of the prompt is fully determined by the model, the shared
+            # instructions and its search results, so an identical request can reuse the earlier answer.
+            cache_key = hashlib.sha256(json.dumps(
+                {"model": ANTHROPIC_MODEL, "instructions": ANALYSIS_INSTRUCTIONS, "context": context},
+                sort_keys=True
+            ).encode()).hexdigest()
+            result_urls = normalize_result_urls(
+                [r for r in search_results if url_belongs_to_org(org_name, r.get('url', ''))]
+            )
+            cached_response = self._get_cached_response(org_name, cache_key, result_urls)
+            if cached_response is not None:
+                parsed_responses[i] = cached_response
+            else:
+                pending.append((i, org_name, context, cache_key, result_urls))
+
+        if pending:
+            label = ", ".join(org_name for _, org_name, _, _, _ in pending)
+            org_sections = "".join(
+                f"ORG {n}: {org_name}\n{context}"
+                for n, (_, org_name, context, _, _) in enumerate(pending, start=1)
+            )
+            logger.debug("Prompt for Anthropic API for %s:\n%s\n\n%s", label, ANALYSIS_INSTRUCTIONS, org_sections)
+
+            # The instructions are identical for every request, so they go in their own content block
+            # marked for Anthropic's prompt cache, ahead of the per-batch search results.
+            data = {
+                "model": ANTHROPIC_MODEL,
+                "max_tokens": 4000,
+                "stream": True,
+                "messages": [{
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": ANALYSIS_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": org_sections}
+                    ]
+                }]
+            }
+            answers = match_answers(
+                [org_name for _, org_name, _, _, _ in pending], self._call_anthropic(label, data), label
+            )
+            for (i, org_name, _, cache_key, result_urls), answer in zip(pending, answers):
+                if answer:
+                    parsed_responses[i] = answer
+                    self._store_response(org_name, cache_key, result_urls, answer)
+
+        return [
+            self._build_result(org_name, official, dict(parsed_response))
+            for (org_name, _), official, parsed_response in zip(items, official_results, parsed_responses)
+        ]
+
+    def analyze_search_results(self, org_name: str, search_results: List[Dict]) -> Dict:
+        """
+        Analyzes a single organization's search results; see analyze_batch.
+        """
+        return self.analyze_batch([(org_name, search_results)])[0]
+
+    def _build_result(self, org_name: str, official_results: List[Dict], parsed_response: Dict) -> Dict:
+        """
+        Fills in any fields Claude left empty from the organization's official search results
+        (see official_search_results) and returns the final row.
+        """
         # Fallback for source_url: only accept a URL if it appears to be from an official source.
         if not parsed_response.get("source_url"):
-            for r in search_results:
+            for r in official_results:
                 url = r.get("url", "")
-                if url and result_matches_org(org_name, r) and url_belongs_to_org(org_name, url):
+                if url:
                     parsed_response["source_url"] = url
                     break
 
         # Fallback for target_date: only from a result that appears to be from the official source.
         if not parsed_response.get("target_date"):
-            for r in search_results:
-                if result_matches_org(org_name, r) and url_belongs_to_org(org_name, r.get("url", "")):
-                    desc = r.get("description", "")
-                    match = re.search(r'\b(20\d{2})\b', desc)
-                    if match:
-                        parsed_response["target_date"] = match.group(1)
-                        break
+            for r in official_results:
+                match = _YEAR_RE.search(r.get("description", ""))
+                if match:
+                    parsed_response["target_date"] = match.group(1)
+                    break
 
         # Fallback for description: only if the result appears relevant and from an official source.
         if not parsed_response.get("description"):
-            for r in search_results:
-                desc = r.get("description", "")
-                if (("decarbon" in desc.lower() or "net zero" in desc.lower()) and 
-                    result_matches_org(org_name, r) and url_belongs_to_org(org_name, r.get("url", ""))):
-                    parsed_response["description"] = desc.strip()[:250]
+            for r in official_results:
+                if mentions_goal(r):
+                    parsed_response["description"] = r.get("description", "").strip()[:250]
                     break
 
         return {
@@ -219,6 +645,33 @@ class DecarbonizationAnalyzer:
             "description": parsed_response.get("description", "")
         }
 
+def not_found_result(org_name: str) -> Dict:
+    """Return the result row used when nothing could be determined for an organization."""
+    return {
+        "organization": org_name,
+        "has_goal": "Not Found",
+        "target_date": None,
+        "source_url": None,
+        "description": ""
+    }
+
+def map_isolated(executor: ThreadPoolExecutor, fn: Callable, args: List, fallback: Callable, describe: Callable = str) -> List:
+    """
+    Like executor.map, but a call that raises is logged with its traceback and replaced by
+    fallback(arg) instead of aborting the remaining work. describe(arg) names the failed
+    input in the log. Results keep the order of args.
+    """
+    futures = {executor.submit(fn, arg): i for i, arg in enumerate(args)}
+    results = [None] * len(args)
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            results[i] = future.result()
+        except Exception:
+            logger.exception("Unexpected error in %s for %s", fn.__name__, describe(args[i]))
+            results[i] = fallback(args[i])
+    return results
+
 def analyze_decarbonization_goals(org_list: List[str], output_csv: str):
     """
     Processes a list of organizations, analyzes decarbonization goals,
@@ -247,23 +700,43 @@ def analyze_decarbonization_goals(org_list: List[str], output_csv: str):
         anthropic_api_key=anthropic_api_key
     )
     
-    results = []
-    for org in org_list:
-        print(f"\nAnalyzing {org}...")
-        search_results = analyzer.search_organization(org)
-        analysis = analyzer.analyze_search_results(org, search_results)
-        results.append(analysis)
-        time.sleep(1)
-    
-    df = pd.DataFrame(results)
-    df.to_csv(output_csv, index=False)
-    print(f"\nCSV saved to {output_csv}\n")
+    # Organizations are independent, so searches run several at a time; the results are then
+    # analyzed in batches of BATCH_SIZE per Anthropic request, also concurrently.
+    # Everything stays in the same order as org_list.
+    def search_with_progress(org_name: str) -> List[Dict]:
+        print(f"\nAnalyzing {org_name}...")
+        return analyzer.search_organization(org_name)
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            search_results = map_isolated(executor, search_with_progress, org_list, lambda org: [])
+            items = list(zip(org_list, search_results))
+            batches = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+            batch_results = map_isolated(
+                executor, analyzer.analyze_batch, batches,
+                lambda batch: [not_found_result(org) for org, _ in batch],
+                describe=lambda batch: ", ".join(org for org, _ in batch)
+            )
+            results = [row for batch in batch_results for row in batch]
+    finally:
+        analyzer.close()
     
-    total_orgs = len(df)
-    orgs_with_goals = len(df[df['has_goal'].str.lower() == 'yes'])
-    print("Organization,Decarbonization Goal?,Target Date,Source URL,Description")
-    for _, row in df.iterrows():
-        print(f"{row['organization']},{row['has_goal']},{row['target_date']},{row['source_url']},{row['description']}")
+    # Write the CSV file and echo the same rows to the console in a single pass.
+    print()
+    total_orgs = len(results)
+    orgs_with_goals = 0
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        file_writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        console_writer = csv.DictWriter(sys.stdout, fieldnames=CSV_FIELDS, lineterminator='\n')
+        file_writer.writeheader()
+        console_writer.writerow(dict(zip(CSV_FIELDS, CONSOLE_HEADER)))
+        for row in results:
+            file_writer.writerow(row)
+            console_writer.writerow(row)
+            if str(row['has_goal']).lower() == 'yes':
+                orgs_with_goals += 1
+    print(f"\nCSV saved to {output_csv}")
+
     print("\nDecarbonization Goals Analysis Summary")
     print("-" * 30)
     print(f"Total Organizations: {total_orgs}")